@@ -1,6 +1,8 @@
 import argparse
 import sys
+from datetime import datetime
 from scanner.port_inspector import PortInspector
+from reports.report_store import ReportStore
 from utils.validator import Validator
 
 def parse_arguments():
@@ -14,6 +16,7 @@ def parse_arguments():
   python main.py -t example.com -s 80 -e 443
   python main.py -t example.com --start-port 1 --end-port 1024
   python main.py -t example.com --start-port 1 --end-port 1024 --timeout 30 --threads 100
+  python main.py reports query --port 3389 --since 2024-01-01
 
 
 Disclaimer:
@@ -60,11 +63,119 @@ Disclaimer:
 
     return parser.parse_args()
 
+def non_negative_int(value):
+    """Argparse type for counts that can't be negative
+    """
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"{value} must be 0 or more")
+    return number
+
+def parse_report_arguments(argv):
+    """Parse args of the reports subcommand
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py reports',
+        description='Query the history of saved scan reports.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''Examples:
+  python main.py reports ingest
+  python main.py reports query --port 3389 --since 2024-01-01
+  python main.py reports query --host example.com --until "2024-06-30 23:59:59"
+  python main.py reports stats --by host --port 22'''
+    )
+
+    parser.add_argument(
+        'action',
+        choices=['ingest', 'rebuild', 'query', 'stats'],
+        help='ingest new reports, rebuild the store, list open ports or count them'
+    )
+
+    parser.add_argument(
+        '-p', '--port',
+        type=int,
+        help='Only include this port'
+    )
+
+    parser.add_argument(
+        '--host',
+        help='Only include this target host or IP address'
+    )
+
+    parser.add_argument(
+        '--since',
+        type=datetime.fromisoformat,
+        help='Only include scans started at or after this time (e.g. 2024-01-01)'
+    )
+
+    parser.add_argument(
+        '--until',
+        type=datetime.fromisoformat,
+        help='Only include scans started at or before this time'
+    )
+
+    parser.add_argument(
+        '--by',
+        choices=['port', 'host', 'service'],
+        default='port',
+        help='Group stats by port, host or service (Default: port)'
+    )
+
+    parser.add_argument(
+        '--limit',
+        type=non_negative_int,
+        default=100,
+        help='Maximum rows to show for query (Default: 100, 0 for all)'
+    )
+
+    return parser.parse_args(argv)
+
+def run_reports(argv):
+    """
+    Ingest new reports and answer history queries
+    """
+    args = parse_report_arguments(argv)
+    store = ReportStore()
+
+    try:
+        # Pick up any report written since the last run
+        if args.action == 'rebuild':
+            added = store.rebuild()
+        else:
+            added = store.ingest()
+        if added or args.action in ('ingest', 'rebuild'):
+            print(f"Ingested {added} new records ({store.rows} total).")
+
+        if args.action == 'query':
+            rows = store.query(args.port, args.host, args.since, args.until, args.limit)
+            if not rows:
+                print("No matching open ports were found.")
+            for row in rows:
+                print(f"{row['time']}  {row['host']} ({row['ip']})  "
+                      f"Port: {row['port']}/TCP - Service: {row['service']}")
+
+        elif args.action == 'stats':
+            groups = store.aggregate(args.by, args.port, args.host, args.since, args.until)
+            if not groups:
+                print("No matching open ports were found.")
+            else:
+                print(f"{args.by:<30}{'seen open':>10}{'hosts':>8}")
+                print("-" * 48)
+            for key, count, hosts in groups:
+                print(f"{str(key):<30}{count:>10}{hosts:>8}")
+    finally:
+        store.close()
+
 def main():
     """
     Main function to run the port scanner
     """
     try:
+        # Report history has its own set of args
+        if len(sys.argv) > 1 and sys.argv[1] == 'reports':
+            run_reports(sys.argv[2:])
+            return
+
         args = parse_arguments()
 
         # Initiate scanner and validator
@@ -0,0 +1,678 @@
+import array
+import bisect
+import csv
+import json
+import mmap
+import os
+import re
+import shutil
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Report files look like <target>_<YYYYmmdd_HHMMSS>.csv / .txt
+REPORT_NAME = re.compile(r'^(?P<stem>.+_(?P<stamp>\d{8}_\d{6}))\.(?P<ext>csv|txt)$')
+
+# Naive epoch used to store scan times as plain integers
+EPOCH = datetime(1970, 1, 1)
+
+# Table name -> (column name, array typecode), each table is sorted by its first three columns.
+# The port table holds one row per open port, the host table holds the same rows keyed by
+# target and, when it differs, by IP address as well, the time table holds them in time order
+# and the service table groups them by service
+TABLES = {
+    "port": (
+        ("port", "H"),
+        ("host", "I"),
+        ("time", "q"),
+        ("ip", "I"),
+        ("service", "I"),
+    ),
+    "host": (
+        ("key", "I"),
+        ("time", "q"),
+        ("port", "H"),
+        ("host", "I"),
+        ("ip", "I"),
+        ("service", "I"),
+    ),
+    "time": (
+        ("time", "q"),
+        ("port", "H"),
+        ("host", "I"),
+        ("ip", "I"),
+        ("service", "I"),
+    ),
+    "service": (
+        ("service", "I"),
+        ("host", "I"),
+        ("time", "q"),
+        ("port", "H"),
+        ("ip", "I"),
+    ),
+}
+
+# Tables with an offset index on their first column
+INDEXED = ("port", "host", "service")
+
+MAX_PORT = 65535
+
+# Per-key totals kept up to date on ingest so unfiltered stats don't read every row
+SUMMARIES = ("hosts_per_port", "rows_per_host", "rows_per_service", "hosts_per_service")
+
+
+class ReportStore:
+    def __init__(self, reports_dir: Optional[str] = None):
+        # Default to the reports directory next to this file
+        if reports_dir is None:
+            reports_dir = os.path.dirname(os.path.abspath(__file__))
+        self.reports_dir = reports_dir
+
+        # Columnar files live in a hidden directory inside reports
+        self.store_dir = os.path.join(self.reports_dir, ".store")
+        self.manifest_path = os.path.join(self.store_dir, "manifest.json")
+
+        self.files = {}
+        self.skipped = {}
+        self.hosts = []
+        self.services = []
+        self.host_ids = {}
+        self.service_ids = {}
+        self.tables = {}
+        self.indexes = {}
+        self.summaries = {}
+        self.maps = []
+        self.rows = 0
+        self.host_rows = 0
+
+        self.load()
+
+    def load(self) -> None:
+        """Load the manifest and memory-map the column files"""
+        self.close()
+
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as manifest_file:
+                    manifest = json.load(manifest_file)
+            except (IOError, ValueError) as e:
+                print(f"Error reading report store manifest, rebuilding: {e}")
+                manifest = {}
+
+        self.files = manifest.get("files", {})
+        self.skipped = manifest.get("skipped", {})
+        self.hosts = manifest.get("hosts", [])
+        self.services = manifest.get("services", [])
+        self.rows = manifest.get("rows", 0)
+        self.host_rows = manifest.get("host_rows", 0)
+        self.host_ids = {name: i for i, name in enumerate(self.hosts)}
+        self.service_ids = {name: i for i, name in enumerate(self.services)}
+
+        try:
+            for table, columns in TABLES.items():
+                self.tables[table] = {name: self.map_column(f"{table}_{name}", typecode)
+                                      for name, typecode in columns}
+            for table in INDEXED:
+                self.indexes[table] = self.map_column(f"{table}_index", "I")
+            for name in SUMMARIES:
+                self.summaries[name] = self.map_column(f"summary_{name}", "I")
+        except (IOError, OSError, ValueError) as e:
+            print(f"Error opening report store, rebuilding: {e}")
+            self.reset()
+            return
+
+        # Columns and manifest must agree or the store is rebuilt from scratch
+        if not self.is_consistent():
+            if self.rows or self.files or self.skipped:
+                print("Report store is inconsistent, rebuilding.")
+            self.reset()
+
+    def is_consistent(self) -> bool:
+        """Check that column and index sizes match the manifest"""
+        sizes = {"port": self.rows, "host": self.host_rows, "time": self.rows, "service": self.rows}
+        index_sizes = {"port": MAX_PORT + 2, "host": len(self.hosts) + 1,
+                       "service": len(self.services) + 1}
+        for table, columns in self.tables.items():
+            if any(len(column) != sizes[table] for column in columns.values()):
+                return False
+        for table, size in index_sizes.items():
+            if len(self.indexes[table]) != size:
+                return False
+        sizes = self.summary_sizes()
+        return all(len(self.summaries[name]) == sizes[name] for name in SUMMARIES)
+
+    def summary_sizes(self) -> Dict[str, int]:
+        """Return the expected length of every summary array"""
+        return {
+            "hosts_per_port": MAX_PORT + 1,
+            "rows_per_host": len(self.hosts),
+            "rows_per_service": len(self.services),
+            "hosts_per_service": len(self.services),
+        }
+
+    def map_column(self, name: str, typecode: str):
+        """Map a single column file as a typed read-only view"""
+        path = os.path.join(self.store_dir, f"{name}.bin")
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return memoryview(array.array(typecode))
+
+        with open(path, "rb") as column_file:
+            mapped = mmap.mmap(column_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps.append(mapped)
+        return memoryview(mapped).cast(typecode)
+
+    def close(self) -> None:
+        """Release all memory maps"""
+        for columns in self.tables.values():
+            for column in columns.values():
+                column.release()
+        for view in list(self.indexes.values()) + list(self.summaries.values()):
+            view.release()
+        for mapped in self.maps:
+            mapped.close()
+        self.tables = {}
+        self.indexes = {}
+        self.summaries = {}
+        self.maps = []
+
+    def reset(self) -> None:
+        """Forget everything so the next ingest starts from an empty store"""
+        self.close()
+        self.files = {}
+        self.skipped = {}
+        self.hosts = []
+        self.services = []
+        self.host_ids = {}
+        self.service_ids = {}
+        self.rows = 0
+        self.host_rows = 0
+        for table, columns in TABLES.items():
+            self.tables[table] = {name: memoryview(array.array(typecode))
+                                  for name, typecode in columns}
+        self.indexes["port"] = memoryview(array.array("I", [0] * (MAX_PORT + 2)))
+        self.indexes["host"] = memoryview(array.array("I", [0]))
+        self.indexes["service"] = memoryview(array.array("I", [0]))
+        for name, size in self.summary_sizes().items():
+            self.summaries[name] = memoryview(array.array("I", [0] * size))
+
+    def pending_reports(self) -> Dict[str, str]:
+        """Find report files that haven't been ingested yet"""
+        try:
+            names = sorted(os.listdir(self.reports_dir))
+        except OSError as e:
+            print(f"Error listing reports in {self.reports_dir}: {e}")
+            return {}
+
+        pending = {}
+        for name in names:
+            match = REPORT_NAME.match(name)
+            if not match or match.group("stem") in self.files:
+                continue
+            # Prefer the CSV report, use the TXT one only when it's alone
+            stem = match.group("stem")
+            if match.group("ext") == "csv" or stem not in pending:
+                pending[stem] = os.path.join(self.reports_dir, name)
+
+        # Unreadable reports are only retried once they change
+        for stem, path in list(pending.items()):
+            if stem in self.skipped and self.skipped[stem] == [os.path.basename(path), self.mtime(path)]:
+                del pending[stem]
+        return pending
+
+    def ingest(self) -> int:
+        """Ingest new report files into the store, return number of new rows"""
+        pending = self.pending_reports()
+        if not pending:
+            return 0
+
+        new_rows = []
+        new_keys = []
+        for stem, path in pending.items():
+            scan = self.parse_report(path)
+            if scan is None:
+                self.skipped[stem] = [os.path.basename(path), self.mtime(path)]
+                continue
+            host = self.intern(scan["target"], self.hosts, self.host_ids)
+            ip = self.intern(scan["target_ip"], self.hosts, self.host_ids)
+            time = self.to_epoch(scan["start_time"])
+            for port, service in scan["open_ports"]:
+                service_id = self.intern(service, self.services, self.service_ids)
+                new_rows.append((port, host, time, ip, service_id))
+                new_keys.append((host, time, port, host, ip, service_id))
+                if ip != host:
+                    new_keys.append((ip, time, port, host, ip, service_id))
+            self.files[stem] = os.path.basename(path)
+            self.skipped.pop(stem, None)
+
+        new_rows.sort()
+        new_keys.sort()
+
+        # Summaries compare against the old rows, so they're built before merging
+        files = {f"summary_{name}": summary
+                 for name, summary in self.grow_summaries(new_rows).items()}
+        new_times = sorted((time, port, host, ip, service)
+                           for port, host, time, ip, service in new_rows)
+        new_services = sorted((service, host, time, port, ip)
+                              for port, host, time, ip, service in new_rows)
+        for table, rows in (("port", new_rows), ("host", new_keys), ("time", new_times),
+                            ("service", new_services)):
+            for name, column in self.merge(table, rows).items():
+                files[f"{table}_{name}"] = column
+        files["port_index"] = self.grow_index("port", new_rows, MAX_PORT + 2)
+        files["host_index"] = self.grow_index("host", new_keys, len(self.hosts) + 1)
+        files["service_index"] = self.grow_index("service", new_services, len(self.services) + 1)
+
+        self.rows += len(new_rows)
+        self.host_rows += len(new_keys)
+        self.write(files)
+        self.load()
+        return len(new_rows)
+
+    def rebuild(self) -> int:
+        """Drop the store and ingest every report again"""
+        self.reset()
+
+        # Remove the old files too, or they'd be loaded again when no report is left
+        try:
+            shutil.rmtree(self.store_dir)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing report store {self.store_dir}: {e}")
+        return self.ingest()
+
+    def merge(self, table: str, new_rows: List[tuple]) -> Dict[str, array.array]:
+        """Insert sorted new rows into a table, copying old rows in bulk slices"""
+        old = self.tables[table]
+        names = [name for name, _ in TABLES[table]]
+        sort_columns = [old[name] for name in names[:3]]
+        index = self.indexes.get(table)
+
+        # New rows are sorted, so their insertion points only move forward
+        positions = [self.insert_position(index, sort_columns, row) for row in new_rows]
+
+        merged = {}
+        for k, (name, typecode) in enumerate(TABLES[table]):
+            column = old[name]
+            out = array.array(typecode)
+            start = 0
+            for position, row in zip(positions, new_rows):
+                if position > start:
+                    out.frombytes(column[start:position].cast("B"))
+                    start = position
+                out.append(row[k])
+            out.frombytes(column[start:].cast("B"))
+            merged[name] = out
+        return merged
+
+    def insert_position(self, index, sort_columns: list, row: tuple) -> int:
+        """Return where a row goes in a table sorted by its first three columns"""
+        lo, hi = 0, len(sort_columns[0])
+        if index is not None:
+            key = row[0]
+            if key + 1 >= len(index):
+                return index[-1]
+            lo, hi = index[key], index[key + 1]
+
+        for column, value in zip(sort_columns, row[:3]):
+            lo = bisect.bisect_left(column, value, lo, hi)
+            hi = bisect.bisect_right(column, value, lo, hi)
+        return hi
+
+    def grow_index(self, table: str, new_rows: List[tuple], size: int) -> array.array:
+        """Shift the offset index of a table by the rows being inserted"""
+        index = array.array("I")
+        index.frombytes(self.indexes[table].cast("B"))
+        index.extend([index[-1]] * (size - len(index)))
+        if not new_rows:
+            return index
+
+        counts = Counter(row[0] for row in new_rows)
+        added = 0
+        for key in range(min(counts), size - 1):
+            added += counts.get(key, 0)
+            index[key + 1] += added
+        return index
+
+    def grow_summaries(self, new_rows: List[tuple]) -> Dict[str, array.array]:
+        """Add the rows being inserted to the per-key totals"""
+        summaries = {}
+        for name, size in self.summary_sizes().items():
+            summary = array.array("I")
+            summary.frombytes(self.summaries[name].cast("B"))
+            summary.extend([0] * (size - len(summary)))
+            summaries[name] = summary
+
+        for port, host, _, _, service in new_rows:
+            summaries["rows_per_host"][host] += 1
+            summaries["rows_per_service"][service] += 1
+
+        # A host only counts once per port or service, so check the old rows for it
+        index = self.indexes["port"]
+        hosts = self.tables["port"]["host"]
+        for port, host in set((row[0], row[1]) for row in new_rows):
+            lo, hi = index[port], index[port + 1]
+            i = bisect.bisect_left(hosts, host, lo, hi)
+            if i == hi or hosts[i] != host:
+                summaries["hosts_per_port"][port] += 1
+
+        for service, host in set((row[4], row[1]) for row in new_rows):
+            if not self.has_service(host, service):
+                summaries["hosts_per_service"][service] += 1
+        return summaries
+
+    def has_service(self, host: int, service: int) -> bool:
+        """Check whether a target already has rows for a service"""
+        index = self.indexes["host"]
+        if host + 1 >= len(index):
+            return False
+        columns = self.tables["host"]
+        return any(columns["host"][i] == host and columns["service"][i] == service
+                   for i in range(index[host], index[host + 1]))
+
+    def write(self, files: Dict[str, array.array]) -> None:
+        """Persist columns, offset indexes, summaries and manifest"""
+        manifest = {
+            "rows": self.rows,
+            "host_rows": self.host_rows,
+            "files": self.files,
+            "skipped": self.skipped,
+            "hosts": self.hosts,
+            "services": self.services,
+        }
+
+        # Maps must be closed before their files are replaced
+        self.close()
+        os.makedirs(self.store_dir, exist_ok=True)
+
+        for name, column in files.items():
+            path = os.path.join(self.store_dir, f"{name}.bin")
+            with open(f"{path}.tmp", "wb") as column_file:
+                column.tofile(column_file)
+            os.replace(f"{path}.tmp", path)
+
+        # Manifest goes last so a partial write is detected on load
+        with open(f"{self.manifest_path}.tmp", "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+
+    def query(self, port: Optional[int] = None, host: Optional[str] = None,
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              limit: Optional[int] = None) -> List[dict]:
+        """Return open port observations matching the filters"""
+        table, spans = self.select(port, host, since, until)
+        columns = self.tables[table]
+
+        # A limit of 0 or less returns every match
+        results = []
+        for lo, hi in spans:
+            for i in range(lo, hi):
+                if limit is not None and 0 < limit <= len(results):
+                    return results
+                results.append({
+                    "port": columns["port"][i],
+                    "host": self.hosts[columns["host"][i]],
+                    "ip": self.hosts[columns["ip"][i]],
+                    "service": self.services[columns["service"][i]],
+                    "time": self.from_epoch(columns["time"][i]),
+                })
+        return results
+
+    def aggregate(self, by: str = "port", port: Optional[int] = None,
+                  host: Optional[str] = None, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None) -> List[Tuple[object, int, int]]:
+        """Count observations and distinct hosts grouped by port, host or service"""
+        if by not in ("port", "host", "service"):
+            raise ValueError(f"Can't aggregate by {by}.")
+
+        if host is None and since is None and until is None and port is None:
+            counts, distinct = self.aggregate_summaries(by)
+        elif host is None and since is None and until is None:
+            counts, distinct = self.aggregate_block(by, port)
+        elif host is None and self.runs_are_cheaper(by, port, since, until):
+            counts, distinct = self.aggregate_runs(by, port, since, until)
+        else:
+            table, spans = self.select(port, host, since, until)
+            keys = self.tables[table][by]
+            hosts = self.tables[table]["host"]
+            pairs = Counter()
+            for lo, hi in spans:
+                pairs.update(zip(keys[lo:hi], hosts[lo:hi]))
+            counts, distinct = self.count_pairs(pairs)
+
+        names = {"port": None, "host": self.hosts, "service": self.services}[by]
+        return [(names[key] if names else key, count, distinct[key])
+                for key, count in counts.most_common()]
+
+    def aggregate_summaries(self, by: str) -> Tuple[Counter, Counter]:
+        """Aggregate the whole store from the per-key totals"""
+        if by == "port":
+            index = self.indexes["port"]
+            hosts = self.summaries["hosts_per_port"]
+            counts = Counter({p: index[p + 1] - index[p] for p in range(1, MAX_PORT + 1)
+                              if index[p + 1] != index[p]})
+            return counts, Counter({p: hosts[p] for p in counts})
+
+        if by == "host":
+            rows = self.summaries["rows_per_host"]
+            counts = Counter({host: count for host, count in enumerate(rows) if count})
+            return counts, Counter(dict.fromkeys(counts, 1))
+
+        rows = self.summaries["rows_per_service"]
+        hosts = self.summaries["hosts_per_service"]
+        counts = Counter({service: count for service, count in enumerate(rows) if count})
+        return counts, Counter({service: hosts[service] for service in counts})
+
+    def aggregate_block(self, by: str, port: int) -> Tuple[Counter, Counter]:
+        """Aggregate one port block using the port index and host runs"""
+        counts = Counter()
+        distinct = Counter()
+        if not 1 <= port <= MAX_PORT:
+            return counts, distinct
+
+        lo, hi = self.indexes["port"][port], self.indexes["port"][port + 1]
+        hosts = self.tables["port"]["host"]
+        if by == "service":
+            services = self.tables["port"]["service"]
+            return self.count_pairs(Counter(zip(services[lo:hi], hosts[lo:hi])))
+
+        # Hosts are sorted inside the block, so every run is one distinct host
+        for host, start, end in self.runs(hosts, lo, hi):
+            key = port if by == "port" else host
+            counts[key] += end - start
+            distinct[key] += 1
+        return counts, distinct
+
+    def runs_are_cheaper(self, by: str, port: Optional[int], since: Optional[datetime],
+                         until: Optional[datetime]) -> bool:
+        """Check whether walking host runs beats reading every row in the time range"""
+        if port is not None:
+            return by != "service"
+
+        start = self.to_epoch(since) if since else None
+        end = self.to_epoch(until) if until else None
+        lo, hi = self.time_span(self.tables["time"]["time"], 0, self.rows, start, end)
+        runs = self.summaries["hosts_per_service" if by == "service" else "hosts_per_port"]
+        return sum(runs) < hi - lo
+
+    def aggregate_runs(self, by: str, port: Optional[int], since: Optional[datetime],
+                       until: Optional[datetime]) -> Tuple[Counter, Counter]:
+        """Aggregate a time range by bisecting the time inside each host run"""
+        start = self.to_epoch(since) if since else None
+        end = self.to_epoch(until) if until else None
+
+        if by == "service":
+            table, keys = "service", range(len(self.services))
+        else:
+            table = "port"
+            keys = [port] if port is not None else range(1, MAX_PORT + 1)
+        index = self.indexes[table]
+        hosts = self.tables[table]["host"]
+        times = self.tables[table]["time"]
+
+        counts = Counter()
+        distinct = Counter()
+        for key in keys:
+            for host, run_start, run_end in self.runs(hosts, index[key], index[key + 1]):
+                lo, hi = self.time_span(times, run_start, run_end, start, end)
+                if lo == hi:
+                    continue
+                if by == "host":
+                    counts[host] += hi - lo
+                    distinct[host] = 1
+                else:
+                    counts[key] += hi - lo
+                    distinct[key] += 1
+        return counts, distinct
+
+    def count_pairs(self, pairs: Counter) -> Tuple[Counter, Counter]:
+        """Turn (key, host) counts into per-key totals and distinct hosts"""
+        counts = Counter()
+        distinct = Counter()
+        for (key, _), count in pairs.items():
+            counts[key] += count
+            distinct[key] += 1
+        return counts, distinct
+
+    def runs(self, column, lo: int, hi: int) -> Iterable[Tuple[int, int, int]]:
+        """Yield (value, start, end) for each run of equal values in a sorted range"""
+        while lo < hi:
+            value = column[lo]
+            end = bisect.bisect_right(column, value, lo, hi)
+            yield value, lo, end
+            lo = end
+
+    def select(self, port: Optional[int], host: Optional[str], since: Optional[datetime],
+               until: Optional[datetime]) -> Tuple[str, List[Tuple[int, int]]]:
+        """Return the table to read and the (start, end) row spans matching the filters"""
+        start = self.to_epoch(since) if since else None
+        end = self.to_epoch(until) if until else None
+
+        if port is not None and not 1 <= port <= MAX_PORT:
+            return "port", []
+
+        # Host rows, by target or IP, are contiguous and sorted by time
+        if host is not None:
+            host_id = self.host_ids.get(host.strip())
+            if host_id is None:
+                return "host", []
+            index = self.indexes["host"]
+            lo, hi = self.time_span(self.tables["host"]["time"], index[host_id],
+                                    index[host_id + 1], start, end)
+            if port is None:
+                return "host", [(lo, hi)]
+            ports = self.tables["host"]["port"]
+            return "host", [(i, i + 1) for i in range(lo, hi) if ports[i] == port]
+
+        # The time table answers a pure time range with two bisects
+        if port is None:
+            if start is None and end is None:
+                return "port", [(0, self.rows)]
+            return "time", [self.time_span(self.tables["time"]["time"], 0, self.rows, start, end)]
+
+        # Port index narrows the search to one block, time is sorted inside each host run
+        lo, hi = self.indexes["port"][port], self.indexes["port"][port + 1]
+        if start is None and end is None:
+            return "port", [(lo, hi)]
+        times = self.tables["port"]["time"]
+        spans = []
+        for _, run_start, run_end in self.runs(self.tables["port"]["host"], lo, hi):
+            span = self.time_span(times, run_start, run_end, start, end)
+            if span[0] < span[1]:
+                spans.append(span)
+        return "port", spans
+
+    def time_span(self, times, lo: int, hi: int, start: Optional[int],
+                  end: Optional[int]) -> Tuple[int, int]:
+        """Narrow a time-sorted range to the rows between start and end"""
+        if start is not None:
+            lo = bisect.bisect_left(times, start, lo, hi)
+        if end is not None:
+            hi = bisect.bisect_right(times, end, lo, hi)
+        return lo, hi
+
+    def parse_report(self, path: str) -> Optional[dict]:
+        """Parse a CSV or TXT report written by ReportWriter"""
+        scan = {"target": None, "target_ip": None, "start_time": None, "open_ports": []}
+        try:
+            if path.endswith(".csv"):
+                self.parse_csv(path, scan)
+            else:
+                self.parse_txt(path, scan)
+        except (IOError, ValueError, csv.Error) as e:
+            print(f"Error reading report {path}: {e}")
+            return None
+
+        if not scan["target"]:
+            print(f"Skipping report without target: {path}")
+            return None
+        if not scan["target_ip"]:
+            scan["target_ip"] = scan["target"]
+
+        # Fall back to the file name timestamp if the scan time is unreadable
+        try:
+            scan["start_time"] = datetime.fromisoformat(scan["start_time"])
+        except (TypeError, ValueError):
+            stamp = REPORT_NAME.match(os.path.basename(path)).group("stamp")
+            scan["start_time"] = datetime.strptime(stamp, "%Y%m%d_%H%M%S")
+        return scan
+
+    def parse_csv(self, path: str, scan: dict) -> None:
+        """Fill scan info and open ports from a CSV report"""
+        fields = {"Target": "target", "IP Address": "target_ip", "Scan Start": "start_time"}
+        in_ports = False
+        with open(path, newline="") as csvfile:
+            for row in csv.reader(csvfile):
+                if not row:
+                    continue
+                if in_ports:
+                    port = int(row[0])
+                    if 1 <= port <= MAX_PORT:
+                        scan["open_ports"].append((port, row[1] if len(row) > 1 else "unknown"))
+                elif row == ["port", "service"]:
+                    in_ports = True
+                elif row[0] in fields and len(row) > 1:
+                    scan[fields[row[0]]] = row[1]
+
+    def parse_txt(self, path: str, scan: dict) -> None:
+        """Fill scan info and open ports from a TXT report"""
+        fields = {"Target Host": "target", "IP Address": "target_ip", "Scan Start": "start_time"}
+        port_line = re.compile(r'^Port (\d+)/TCP\s*- Service: (.*)$')
+        with open(path) as txtfile:
+            for line in txtfile:
+                line = line.rstrip("\n")
+                match = port_line.match(line)
+                if match:
+                    port = int(match.group(1))
+                    if 1 <= port <= MAX_PORT:
+                        scan["open_ports"].append((port, match.group(2)))
+                    continue
+                key, _, value = line.partition(": ")
+                if key in fields:
+                    scan[fields[key]] = value
+
+    def intern(self, value: str, table: list, ids: dict) -> int:
+        """Return the id of a string, adding it to the table if new"""
+        if value not in ids:
+            ids[value] = len(table)
+            table.append(value)
+        return ids[value]
+
+    def mtime(self, path: str) -> float:
+        """Return the modification time of a file, or 0 if it can't be read"""
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    def to_epoch(self, moment: datetime) -> int:
+        """Convert a time to seconds since the naive epoch, in local time like the reports"""
+        if moment.tzinfo is not None:
+            moment = moment.astimezone().replace(tzinfo=None)
+        return int((moment - EPOCH).total_seconds())
+
+    def from_epoch(self, seconds: int) -> datetime:
+        """Convert stored seconds back to a naive local datetime"""
+        return EPOCH + timedelta(seconds=seconds)
@@ -0,0 +1,248 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from reports.report_store import ReportStore
+from reports.report_writer import ReportWriter
+
+
+BASE = datetime(2026, 1, 1)
+PORTS = [21, 22, 80, 443, 3389, 8080]
+
+
+def write_scan(reports_dir, target, ip, start, ports, csv_report=True, txt_report=False):
+    """Write a report the same way a scan does and return its observations"""
+    writer = ReportWriter()
+    writer.reports_dir = str(reports_dir)
+    scan = {
+        "target": target,
+        "target_ip": ip,
+        "start_time": start,
+        "end_time": start,
+        "duration": 1.0,
+        "ports_scanned": 1024,
+        "open_ports": [{"port": port, "service": f"svc{port}"} for port in ports],
+    }
+    filename = f"{target.replace('.', '_')}_{start.strftime('%Y%m%d_%H%M%S')}"
+    if csv_report:
+        writer.write_csv_report(scan, filename)
+    if txt_report:
+        writer.write_txt_report(scan, filename)
+    return [(port, target, ip, f"svc{port}", start) for port in ports]
+
+
+def as_tuples(rows):
+    return sorted((row["port"], row["host"], row["ip"], row["service"], row["time"]) for row in rows)
+
+
+@pytest.fixture
+def history(tmp_path):
+    """Write a few hundred scans, some of them targeted by IP address"""
+    rng = random.Random(26)
+    expected = []
+    for i in range(200):
+        ip = f"10.0.0.{i % 12}"
+        target = ip if i % 5 == 0 else f"host{i % 12}.example.com"
+        start = BASE + timedelta(hours=7 * i)
+        ports = rng.sample(PORTS, rng.randint(0, 4))
+        expected += write_scan(tmp_path, target, ip, start, ports, txt_report=i % 40 == 0)
+    return tmp_path, expected
+
+
+def brute_force(expected, port=None, host=None, since=None, until=None):
+    return sorted(row for row in expected
+                  if (port is None or row[0] == port)
+                  and (host is None or host in (row[1], row[2]))
+                  and (since is None or row[4] >= since)
+                  and (until is None or row[4] <= until))
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"port": 3389},
+    {"port": 9999},
+    {"host": "host3.example.com"},
+    {"host": "10.0.0.3"},
+    {"host": "unknown.example.com"},
+    {"host": "10.0.0.5", "port": 22},
+    {"since": BASE + timedelta(days=20)},
+    {"until": BASE + timedelta(days=10)},
+    {"port": 80, "since": BASE + timedelta(days=5), "until": BASE + timedelta(days=30)},
+    {"host": "10.0.0.7", "since": BASE + timedelta(days=5), "until": BASE + timedelta(days=40)},
+])
+def test_query_matches_brute_force(history, filters):
+    reports_dir, expected = history
+    store = ReportStore(str(reports_dir))
+    store.ingest()
+
+    assert as_tuples(store.query(**filters)) == brute_force(expected, **filters)
+    store.close()
+
+
+@pytest.mark.parametrize("by", ["port", "host", "service"])
+@pytest.mark.parametrize("filters", [{}, {"port": 443}, {"host": "10.0.0.2"},
+                                     {"since": BASE + timedelta(days=15)},
+                                     {"port": 22, "until": BASE + timedelta(days=25)}])
+def test_aggregate_matches_brute_force(history, by, filters):
+    reports_dir, expected = history
+    store = ReportStore(str(reports_dir))
+    store.ingest()
+
+    column = {"port": 0, "host": 1, "service": 3}[by]
+    rows = brute_force(expected, **filters)
+    counts = {}
+    for row in rows:
+        counts.setdefault(row[column], []).append(row[1])
+    wanted = sorted((key, len(hosts), len(set(hosts))) for key, hosts in counts.items())
+
+    assert sorted(store.aggregate(by, **filters)) == wanted
+    store.close()
+
+
+@pytest.mark.parametrize("runs", [True, False])
+@pytest.mark.parametrize("by", ["port", "host", "service"])
+def test_time_aggregate_strategies_agree(history, monkeypatch, by, runs):
+    reports_dir, expected = history
+    store = ReportStore(str(reports_dir))
+    store.ingest()
+    monkeypatch.setattr(store, "runs_are_cheaper", lambda *args: runs)
+
+    since, until = BASE + timedelta(days=10), BASE + timedelta(days=40)
+    column = {"port": 0, "host": 1, "service": 3}[by]
+    counts = {}
+    for row in brute_force(expected, since=since, until=until):
+        counts.setdefault(row[column], []).append(row[1])
+    wanted = sorted((key, len(hosts), len(set(hosts))) for key, hosts in counts.items())
+
+    assert sorted(store.aggregate(by, since=since, until=until)) == wanted
+    store.close()
+
+
+def test_query_limit(history):
+    reports_dir, expected = history
+    store = ReportStore(str(reports_dir))
+    store.ingest()
+
+    assert len(store.query(port=22, limit=3)) == 3
+    for limit in (None, 0, -5):
+        assert as_tuples(store.query(port=22, limit=limit)) == brute_force(expected, port=22)
+    store.close()
+
+
+def test_aware_times_are_converted_to_local_time(history):
+    reports_dir, expected = history
+    store = ReportStore(str(reports_dir))
+    store.ingest()
+
+    since = BASE + timedelta(days=20)
+    aware = since.astimezone(timezone(timedelta(hours=5)))
+    assert as_tuples(store.query(since=aware)) == brute_force(expected, since=since)
+    store.close()
+
+
+def test_ingest_is_incremental(history):
+    reports_dir, expected = history
+    store = ReportStore(str(reports_dir))
+
+    assert store.ingest() == len(expected)
+    assert store.ingest() == 0
+
+    new_rows = write_scan(reports_dir, "late.example.com", "10.0.0.3",
+                          BASE + timedelta(days=90), [22, 3389, 8080])
+    new_rows += write_scan(reports_dir, "host4.example.com", "10.0.0.4",
+                           BASE + timedelta(days=91), [22, 9090])
+    assert store.ingest() == len(new_rows)
+    assert store.rows == len(expected) + len(new_rows)
+    store.close()
+
+    # A fresh store sees the same data without re-ingesting
+    reopened = ReportStore(str(reports_dir))
+    assert reopened.ingest() == 0
+    assert as_tuples(reopened.query()) == sorted(expected + new_rows)
+    assert as_tuples(reopened.query(host="10.0.0.3", port=3389)) == \
+        brute_force(expected + new_rows, host="10.0.0.3", port=3389)
+
+    # Totals kept on ingest agree with a full rebuild
+    totals = {by: sorted(reopened.aggregate(by)) for by in ("port", "host", "service")}
+    reopened.rebuild()
+    assert totals == {by: sorted(reopened.aggregate(by)) for by in ("port", "host", "service")}
+    reopened.close()
+
+
+def test_inconsistent_store_is_rebuilt(history, capsys):
+    reports_dir, expected = history
+    store = ReportStore(str(reports_dir))
+    store.ingest()
+    store.close()
+
+    # Truncate a column so it no longer matches the manifest
+    column_path = os.path.join(str(reports_dir), ".store", "port_time.bin")
+    with open(column_path, "r+b") as column_file:
+        column_file.truncate(8)
+
+    rebuilt = ReportStore(str(reports_dir))
+    assert "inconsistent" in capsys.readouterr().out
+    assert rebuilt.rows == 0
+    assert rebuilt.ingest() == len(expected)
+    assert as_tuples(rebuilt.query()) == sorted(expected)
+    rebuilt.close()
+
+
+def test_rebuild_forgets_missing_reports(tmp_path):
+    write_scan(tmp_path, "gone.example.com", "10.0.0.1", BASE, [22, 80])
+    store = ReportStore(str(tmp_path))
+    assert store.ingest() == 2
+    store.close()
+
+    os.remove(os.path.join(str(tmp_path), "gone_example_com_20260101_000000.csv"))
+    store = ReportStore(str(tmp_path))
+    assert store.rebuild() == 0
+    store.close()
+
+    reopened = ReportStore(str(tmp_path))
+    assert reopened.rows == 0
+    assert reopened.query() == []
+    assert reopened.aggregate("port") == []
+    reopened.close()
+
+
+def test_txt_report_used_only_without_csv(tmp_path):
+    # Both formats exist: only the CSV is read
+    both = write_scan(tmp_path, "both.example.com", "10.0.0.1", BASE, [22, 80], txt_report=True)
+    with open(os.path.join(str(tmp_path), "both_example_com_20260101_000000.txt"), "a") as txtfile:
+        txtfile.write("Port 9999/TCP\t- Service: extra\n")
+
+    # Only the TXT report exists: it is read instead
+    alone = write_scan(tmp_path, "alone.example.com", "10.0.0.2", BASE + timedelta(days=1),
+                       [443], csv_report=False, txt_report=True)
+
+    store = ReportStore(str(tmp_path))
+    assert store.ingest() == len(both + alone)
+    assert as_tuples(store.query()) == sorted(both + alone)
+    store.close()
+
+
+def test_unreadable_report_is_skipped_until_changed(tmp_path, capsys):
+    path = os.path.join(str(tmp_path), "broken_20260101_000000.csv")
+    with open(path, "w") as csvfile:
+        csvfile.write("Scan Report\nport,service\nnot-a-port,http\n")
+
+    store = ReportStore(str(tmp_path))
+    assert store.ingest() == 0
+    assert "Error reading report" in capsys.readouterr().out
+
+    # The same file isn't parsed again
+    assert store.ingest() == 0
+    assert capsys.readouterr().out == ""
+
+    # Once it is fixed it gets ingested
+    with open(path, "w") as csvfile:
+        csvfile.write("Scan Report\nTarget,broken.example.com\nIP Address,10.0.0.9\n"
+                      "Scan Start,2026-01-01 00:00:00\n\nport,service\n22,ssh\n")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert store.ingest() == 1
+    assert store.query(host="broken.example.com")[0]["service"] == "ssh"
+    store.close()